@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 """``cacheutils`` contains consistent implementations of fundamental
-cache types. Currently there are two to choose from:
+cache types. Currently there are three to choose from:
 
   * :class:`LRI` - Least-recently inserted
   * :class:`LRU` - Least-recently used
+  * :class:`RandomReplacementCache` - Pseudo-random replacement
 
-Both caches are :class:`dict` subtypes, designed to be as
-interchangeable as possible, to facilitate experimentation. A key
+All three caches are :class:`dict` subtypes, designed to be as
+interchangeable as possible, to facilitate experimentation. For
+caches under heavy use by many threads, :class:`ShardedLRU` spreads
+keys across several independently-locked :class:`LRU` instances. A key
 practice with performance enhancement with caching is ensuring that
 the caching strategy is working. If the cache is constantly missing,
 it is just adding more overhead and code complexity. The standard
@@ -33,20 +36,29 @@ Learn more about `caching algorithms on Wikipedia
 
 # TODO: TimedLRI
 # TODO: support 0 max_size?
-__all__ = ['LRI', 'LRU']
+__all__ = ['LRI', 'LRU', 'ShardedLRU', 'RandomReplacementCache']
 
-from collections import deque
+from random import randrange
 
-try:
-    from _thread import RLock
-except:
-    class RLock(object):
-        'Dummy reentrant lock for builds without threads'
-        def __enter__(self):
-            pass
 
-        def __exit__(self, exctype, excinst, exctb):
-            pass
+class _NullLock(object):
+    """No-op stand-in for :class:`threading.RLock`, used by caches which
+    are not shared between threads, and by builds without threads.
+    """
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exctype, excinst, exctb):
+        pass
+
+
+# NB: On Python 2, threading.RLock is written in Python, making hits
+# on a thread_safe LRU about 2.5x slower, and inserts about 2x slower,
+# than with thread_safe=False, which single-threaded callers should use.
+try:
+    from threading import RLock
+except ImportError:
+    RLock = _NullLock
 
 try:
     from typeutils import make_sentinel
@@ -57,11 +69,63 @@ except ImportError:
     _KWARG_MARK = object()
 
 
-PREV, NEXT, KEY, VALUE = range(4)   # names for the link fields
 DEFAULT_MAX_SIZE = 128
 
 
-class LRU(dict):
+class _Link(object):
+    "A single entry in the :class:`LRU`'s circular doubly-linked list."
+    __slots__ = ('prev', 'next', 'key', 'value')
+
+    def __init__(self, prev=None, next_=None, key=None, value=None):
+        self.prev = prev
+        self.next = next_
+        self.key = key
+        self.value = value
+
+
+def _make_root():
+    root = _Link()
+    root.prev = root.next = root
+    return root
+
+
+class _CacheMixin(object):
+    """The soft-miss counting :meth:`get` and :meth:`setdefault`, and
+    the item-by-item :meth:`update`, shared by the caches below. Each
+    goes through the cache's own ``__getitem__`` and ``__setitem__``.
+    """
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self.soft_miss_count += 1
+            return default
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self.soft_miss_count += 1
+            self[key] = default
+            return default
+
+    def update(self, E, **F):
+        # E and F are throwback names to the dict() __doc__
+        if E is self:
+            return
+        setitem = self.__setitem__
+        if callable(getattr(E, 'keys', None)):
+            for k in E.keys():
+                setitem(k, E[k])
+        else:
+            for k, v in E:
+                setitem(k, v)
+        for k in F:
+            setitem(k, F[k])
+        return
+
+
+class LRU(_CacheMixin, dict):
     """The ``LRU`` is :class:`dict` subtype implementation of the
     *Least-Recently Used* caching strategy.
 
@@ -70,6 +134,10 @@ class LRU(dict):
         values (iterable): Initial values for the cache. Defaults to ``None``.
         on_miss (callable): a callable which accepts a single argument, the
             key not present in the cache, and returns the value to be cached.
+        thread_safe (bool): Whether to guard the cache with a lock, so
+            that it can be shared between threads. Defaults to
+            ``True``. Caches only used by a single thread can pass
+            ``False`` to skip acquiring the lock on every access.
 
     >>> cap_cache = LRU(max_size=2)
     >>> cap_cache['a'], cap_cache['b'] = 'A', 'B'
@@ -96,16 +164,14 @@ class LRU(dict):
     ``LRU`` acts like its parent class, the built-in Python dict.
     """
     def __init__(self, max_size=DEFAULT_MAX_SIZE, values=None,
-                 on_miss=None):
+                 on_miss=None, thread_safe=True):
         if max_size <= 0:
             raise ValueError('expected max_size > 0, not %r' % max_size)
         self.hit_count = self.miss_count = self.soft_miss_count = 0
         self.max_size = max_size
-        root = []
-        root[:] = [root, root, None, None]
         self.link_map = {}
-        self.root = root
-        self.lock = RLock()
+        self.root = _make_root()
+        self.set_thread_safe(thread_safe)
 
         if on_miss is not None and not callable(on_miss):
             raise TypeError('expected on_miss to be a callable'
@@ -117,25 +183,45 @@ class LRU(dict):
 
     # TODO: fromkeys()?
 
+    def set_thread_safe(self, thread_safe=True):
+        """Enable or disable locking on this cache. Only switch this
+        off while no other thread is using the cache.
+        """
+        self.thread_safe = thread_safe
+        self.lock = RLock() if thread_safe else _NullLock()
+
     def __setitem__(self, key, value):
         with self.lock:
             root = self.root
-            if len(self) < self.max_size:
+            link = self.link_map.get(key)
+            if link is not None:
+                # Already cached, update the value and move the
+                # existing link to the front of the queue, rather
+                # than allocating a new one.
+                link.value = value
+                link.prev.next = link.next
+                link.next.prev = link.prev
+                last = root.prev
+                last.next = root.prev = link
+                link.prev = last
+                link.next = root
+                super(LRU, self).__setitem__(key, value)
+            elif len(self) < self.max_size:
                 # to the front of the queue
-                last = root[PREV]
-                link = [last, root, key, value]
-                last[NEXT] = root[PREV] = link
+                last = root.prev
+                link = _Link(last, root, key, value)
+                last.next = root.prev = link
                 self.link_map[key] = link
                 super(LRU, self).__setitem__(key, value)
             else:
                 # Use the old root to store the new key and result.
                 oldroot = root
-                oldroot[KEY] = key
-                oldroot[VALUE] = value
+                oldroot.key = key
+                oldroot.value = value
                 # prevent ref counts going to zero during update
-                self.root = root = oldroot[NEXT]
-                oldkey, oldresult = root[KEY], root[VALUE]
-                root[KEY] = root[VALUE] = None
+                self.root = root = oldroot.next
+                oldkey, oldresult = root.key, root.value
+                root.key = root.value = None
                 # Now update the cache dictionary.
                 del self.link_map[oldkey]
                 super(LRU, self).__delitem__(oldkey)
@@ -144,40 +230,65 @@ class LRU(dict):
         return
 
     def __getitem__(self, key):
+        if not self.thread_safe:
+            # Unlocked caches skip the with statement entirely, as even
+            # a no-op context manager costs more than the C RLock on
+            # some Python versions.
+            return self._get_item(key)
         with self.lock:
             try:
                 link = self.link_map[key]
             except KeyError:
-                self.miss_count += 1
-                if not self.on_miss:
-                    raise
-                ret = self[key] = self.on_miss(key)
-                return ret
+                link = None
+            if link is None:
+                # outside the except block, so the miss's KeyError (or
+                # on_miss's errors) is not chained to the lookup's
+                return self._handle_miss(key)
 
             self.hit_count += 1
             # Move the link to the front of the queue
+            link_prev, link_next = link.prev, link.next
+            link_prev.next = link_next
+            link_next.prev = link_prev
             root = self.root
-            link_prev, link_next, _key, value = link
-            link_prev[NEXT] = link_next
-            link_next[PREV] = link_prev
-            last = root[PREV]
-            last[NEXT] = root[PREV] = link
-            link[PREV] = last
-            link[NEXT] = root
-            return value
-
-    def get(self, key, default=None):
+            last = root.prev
+            last.next = root.prev = link
+            link.prev = last
+            link.next = root
+            return link.value
+
+    def _get_item(self, key):
+        # the unlocked twin of __getitem__, keep the two in sync
         try:
-            return self[key]
+            link = self.link_map[key]
         except KeyError:
-            self.soft_miss_count += 1
-            return default
+            link = None
+        if link is None:
+            return self._handle_miss(key)
+
+        self.hit_count += 1
+        link_prev, link_next = link.prev, link.next
+        link_prev.next = link_next
+        link_next.prev = link_prev
+        root = self.root
+        last = root.prev
+        last.next = root.prev = link
+        link.prev = last
+        link.next = root
+        return link.value
+
+    def _handle_miss(self, key):
+        self.miss_count += 1
+        if not self.on_miss:
+            raise KeyError(key)
+        ret = self[key] = self.on_miss(key)
+        return ret
 
     def __delitem__(self, key):
         with self.lock:
             link = self.link_map.pop(key)
             super(LRU, self).__delitem__(key)
-            link[PREV][NEXT], link[NEXT][PREV] = link[NEXT], link[PREV]
+            link.prev.next, link.next.prev = link.next, link.prev
 
     def pop(self, key, default=_MISSING):
         # NB: hit/miss counts are bypassed for pop()
@@ -193,42 +304,60 @@ class LRU(dict):
     def popitem(self):
         with self.lock:
             key, link = self.link_map.popitem()
-            super(LRU, self).__delitem__(link[KEY])
-            link[PREV][NEXT], link[NEXT][PREV] = link[NEXT], link[PREV]
-            return key, link[VALUE]
+            super(LRU, self).__delitem__(link.key)
+            link.prev.next, link.next.prev = link.next, link.prev
+            return key, link.value
 
     def clear(self):
         with self.lock:
-            self.root = [self.root, self.root, None, None]
+            self.root = _make_root()
             self.link_map.clear()
             super(LRU, self).clear()
 
     def copy(self):
-        return self.__class__(max_size=self.max_size, values=self)
-
-    def setdefault(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            self.soft_miss_count += 1
-            self[key] = default
-            return default
+        return self.__class__(max_size=self.max_size, values=self,
+                              thread_safe=self.thread_safe)
 
     def update(self, E, **F):
         # E and F are throwback names to the dict() __doc__
         if E is self:
             return
-        setitem = self.__setitem__
         if callable(getattr(E, 'keys', None)):
-            for k in E.keys():
-                setitem(k, E[k])
+            items = [(k, E[k]) for k in E.keys()]
         else:
-            for k, v in E:
+            items = list(E)
+        items.extend([(k, F[k]) for k in F])
+        with self.lock:
+            if not self:
+                self._bulk_load(items)
+                return
+            setitem = self.__setitem__
+            for k, v in items:
                 setitem(k, v)
-        for k in F:
-            setitem(k, F[k])
         return
 
+    def _bulk_load(self, items):
+        # Fills an empty cache with the same result as setting each
+        # item in turn, but only builds links for the keys which would
+        # survive: the last max_size distinct keys, in order of their
+        # last assignment.
+        values, keys = {}, []
+        for k, v in reversed(items):
+            if k in values:
+                continue
+            values[k] = v
+            keys.append(k)
+            if len(keys) >= self.max_size:
+                break
+        keys.reverse()
+
+        root, link_map = self.root, self.link_map
+        last = root
+        for k in keys:
+            last.next = last = link_map[k] = _Link(last, root, k, values[k])
+        root.prev = last
+        dict.update(self, values)  # not _CacheMixin.update
+
     def __eq__(self, other):
         if self is other:
             return True
@@ -246,7 +375,99 @@ class LRU(dict):
                 % (cn, self.max_size, self.on_miss, val_map))
 
 
-class LRI(dict):
+class ShardedLRU(_CacheMixin):
+    """The ``ShardedLRU`` splits its keys across several :class:`LRU`
+    *shards*, each with its own lock, so that threads using different
+    keys do not contend for a single lock. The price is that eviction
+    is only least-recently used within each shard, and capacity is
+    divided evenly between shards.
+
+    Args:
+        max_size (int): Max number of items to cache, across all
+            shards. Defaults to ``128``.
+        shards (int): Number of :class:`LRU` shards, must be a power
+            of two no greater than *max_size*. Defaults to ``16``.
+        on_miss (callable): Passed through to each shard, see
+            :class:`LRU`.
+
+    >>> cache = ShardedLRU(max_size=64, shards=4)
+    >>> cache['a'] = 'A'
+    >>> cache['a'], cache.get('b')
+    ('A', None)
+    >>> cache.hit_count, cache.miss_count, cache.soft_miss_count
+    (1, 1, 1)
+
+    Statistics are summed across shards. Unlike the other caches in
+    this module, ``ShardedLRU`` is not a :class:`dict` subtype.
+    """
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, shards=16, on_miss=None):
+        if shards <= 0 or shards & (shards - 1):
+            raise ValueError('expected shards to be a power of two,'
+                             ' not %r' % shards)
+        if max_size < shards:
+            raise ValueError('expected max_size >= shards (%r), not %r'
+                             % (shards, max_size))
+        self.max_size = max_size
+        self.on_miss = on_miss
+        self._shards = [LRU(max_size // shards, on_miss=on_miss)
+                        for _ in range(shards)]
+        self._mask = shards - 1
+
+    def _get_shard(self, key):
+        return self._shards[hash(key) & self._mask]
+
+    @property
+    def hit_count(self):
+        return sum([shard.hit_count for shard in self._shards])
+
+    @property
+    def miss_count(self):
+        return sum([shard.miss_count for shard in self._shards])
+
+    @property
+    def soft_miss_count(self):
+        return sum([shard.soft_miss_count for shard in self._shards])
+
+    def __getitem__(self, key):
+        return self._shards[hash(key) & self._mask][key]
+
+    def __setitem__(self, key, value):
+        self._shards[hash(key) & self._mask][key] = value
+
+    def __delitem__(self, key):
+        del self._shards[hash(key) & self._mask][key]
+
+    def __contains__(self, key):
+        return key in self._shards[hash(key) & self._mask]
+
+    def __len__(self):
+        return sum([len(shard) for shard in self._shards])
+
+    def __iter__(self):
+        for shard in self._shards:
+            for key in list(shard):
+                yield key
+
+    def get(self, key, default=None):
+        return self._get_shard(key).get(key, default)
+
+    def setdefault(self, key, default=None):
+        return self._get_shard(key).setdefault(key, default)
+
+    def pop(self, key, default=_MISSING):
+        return self._get_shard(key).pop(key, default)
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        return ('%s(max_size=%r, shards=%r, on_miss=%r)'
+                % (cn, self.max_size, len(self._shards), self.on_miss))
+
+
+class LRI(_CacheMixin, dict):
     """The ``LRI`` implements the basic *Least Recently Inserted* strategy to
     caching. One could also think of this as a ``SizeLimitedDefaultDict``.
 
@@ -277,39 +498,35 @@ class LRI(dict):
         self.hit_count = self.miss_count = self.soft_miss_count = 0
         self.max_size = max_size
         self.on_miss = on_miss
-        self._queue = deque()
+        # insertion order ring buffer, _ring[_head] is the oldest key
+        # once the cache is full
+        self._ring = []
+        self._head = 0
 
         if values:
             self.update(values)
 
     def __setitem__(self, key, value):
         # TODO: pop support (see above)
-        if len(self) >= self.max_size:
-            old = self._queue.popleft()
-            del self[old]
-        super(LRI, self).__setitem__(key, value)
-        self._queue.append(key)
-
-    def update(self, E, **F):
-        # E and F are throwback names to the dict() __doc__
-        if E is self:
+        if key in self:
+            super(LRI, self).__setitem__(key, value)
             return
-        setitem = self.__setitem__
-        if callable(getattr(E, 'keys', None)):
-            for k in E.keys():
-                setitem(k, E[k])
+        ring = self._ring
+        if len(ring) < self.max_size:
+            ring.append(key)
         else:
-            for k, v in E:
-                setitem(k, v)
-        for k in F:
-            setitem(k, F[k])
-        return
+            head = self._head
+            super(LRI, self).__delitem__(ring[head])
+            ring[head] = key
+            self._head = (head + 1) % self.max_size
+        super(LRI, self).__setitem__(key, value)
 
     def copy(self):
         return self.__class__(max_size=self.max_size, values=self)
 
     def clear(self):
-        self._queue.clear()
+        self._ring = []
+        self._head = 0
         super(LRI, self).clear()
 
     def __getitem__(self, key):
@@ -324,20 +541,109 @@ class LRI(dict):
         self.hit_count += 1
         return ret
 
-    def get(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            self.soft_miss_count += 1
-            return default
 
-    def setdefault(self, key, default=None):
+class RandomReplacementCache(_CacheMixin, dict):
+    """The ``RandomReplacementCache`` does no bookkeeping at all on
+    reads, and when full, evicts a randomly chosen key to make room
+    for a new one. A list of keys (with each key's position in it) is
+    kept alongside the dict, so picking and removing the victim takes
+    constant time.
+
+    Lookups of cached keys are plain :class:`dict` lookups, which makes
+    this the cheapest cache here to read from. It is a good fit when
+    recency is a weak predictor of reuse, where the :class:`LRU` would
+    pay for ordering that does not improve its hit rate.
+
+    >>> cap_cache = RandomReplacementCache(max_size=2)
+    >>> cap_cache['a'], cap_cache['b'] = 'A', 'B'
+    >>> cap_cache['c'] = 'C'
+    >>> len(cap_cache)
+    2
+    >>> cap_cache['c']
+    'C'
+    >>> cap_cache.miss_count, cap_cache.soft_miss_count
+    (0, 0)
+
+    Because hits go straight to :class:`dict`, ``hit_count`` is not
+    tracked, only ``miss_count`` and ``soft_miss_count``.
+    """
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, values=None,
+                 on_miss=None):
+        if max_size <= 0:
+            raise ValueError('expected max_size > 0, not %r' % max_size)
+        super(RandomReplacementCache, self).__init__()
+        self.miss_count = self.soft_miss_count = 0
+        self.max_size = max_size
+        if on_miss is not None and not callable(on_miss):
+            raise TypeError('expected on_miss to be a callable'
+                            ' (or None), not %r' % on_miss)
+        self.on_miss = on_miss
+        self._keys = []
+        self._key_index = {}
+
+        if values:
+            self.update(values)
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            keys = self._keys
+            if len(keys) >= self.max_size:
+                victim = keys[randrange(len(keys))]
+                super(RandomReplacementCache, self).__delitem__(victim)
+                self._remove_key(victim)
+            self._key_index[key] = len(keys)
+            keys.append(key)
+        super(RandomReplacementCache, self).__setitem__(key, value)
+
+    def _remove_key(self, key):
+        # swap the last key into the removed key's slot
+        keys, key_index = self._keys, self._key_index
+        index = key_index.pop(key)
+        last = keys.pop()
+        if index < len(keys):
+            keys[index] = last
+            key_index[last] = index
+
+    def __delitem__(self, key):
+        super(RandomReplacementCache, self).__delitem__(key)
+        self._remove_key(key)
+
+    def pop(self, key, default=_MISSING):
         try:
-            return self[key]
+            ret = super(RandomReplacementCache, self).pop(key)
         except KeyError:
-            self.soft_miss_count += 1
-            self[key] = default
+            if default is _MISSING:
+                raise KeyError(key)
             return default
+        self._remove_key(key)
+        return ret
+
+    def popitem(self):
+        key, value = super(RandomReplacementCache, self).popitem()
+        self._remove_key(key)
+        return key, value
+
+    def clear(self):
+        super(RandomReplacementCache, self).clear()
+        del self._keys[:]
+        self._key_index.clear()
+
+    def __missing__(self, key):
+        self.miss_count += 1
+        if not self.on_miss:
+            raise KeyError(key)
+        ret = self[key] = self.on_miss(key)
+        return ret
+
+    def copy(self):
+        return self.__class__(max_size=self.max_size, values=self,
+                              on_miss=self.on_miss)
+
+    def __repr__(self):
+        cn = self.__class__.__name__
+        val_map = super(RandomReplacementCache, self).__repr__()
+        return ('%s(max_size=%r, on_miss=%r, values=%s)'
+                % (cn, self.max_size, self.on_miss, val_map))
 
 
 ### Cached decorator
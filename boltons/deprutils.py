@@ -10,26 +10,25 @@ import sys
 from warnings import warn
 
 ModuleType = type(sys)
-
-# todo: only warn once
+_get_module_attribute = ModuleType.__getattribute__
 
 
 class DeprecatableModule(ModuleType):
     def __init__(self, module):
         name = module.__name__
         super(DeprecatableModule, self).__init__(name=name)
+        # members which have not warned yet, only warn once per member
+        self._pending_deprecations = {}
+        self._deprecated_members = {}
         self.__dict__.update(module.__dict__)
 
     def __getattribute__(self, name):
-        get_attribute = super(DeprecatableModule, self).__getattribute__
-        try:
-            depros = get_attribute('_deprecated_members')
-        except AttributeError:
-            self._deprecated_members = depros = {}
-        ret = get_attribute(name)
-        message = depros.get(name)
-        if message is not None:
-            warn(message, DeprecationWarning, stacklevel=2)
+        ret = _get_module_attribute(self, name)
+        pending = _get_module_attribute(self, '_pending_deprecations')
+        # pop() with a default, another thread may have warned already
+        msg = pending.pop(name, None)
+        if msg is not None:
+            warn(msg, DeprecationWarning, stacklevel=2)
         return ret
 
 
@@ -38,4 +37,5 @@ def deprecate_module_member(mod_name, name, message):
     if not isinstance(module, DeprecatableModule):
         sys.modules[mod_name] = module = DeprecatableModule(module)
     module._deprecated_members[name] = message
+    module._pending_deprecations[name] = message
     return
@@ -8,11 +8,18 @@ from __future__ import print_function
 
 import os
 import re
+import sys
 import stat
+import time
 import errno
 import fnmatch
-import tempfile
-from shutil import copy2, copystat, Error
+from itertools import permutations
+import shutil
+from shutil import copy2, copystat, copyfileobj, Error
+try:
+    from shutil import SameFileError
+except ImportError:
+    SameFileError = Error  # shutil raised a plain Error before 3.4
 
 
 __all__ = ['mkdir_p', 'atomic_save', 'AtomicSaver', 'FilePerms',
@@ -21,10 +28,50 @@ __all__ = ['mkdir_p', 'atomic_save', 'AtomicSaver', 'FilePerms',
 
 FULL_PERMS = 511  # 0777 that both Python 2 and 3 can digest
 _SINGLE_FULL_PERM = 7  # or 07 in Python 2
+DEFAULT_IO_BUFSIZE = 1 << 20  # 1 MiB, for AtomicSaver part files
+_PART_PERMS = 384  # 0600, same as tempfile.mkstemp()
+_HAS_DIRS_EXIST_OK = sys.version_info >= (3, 8)  # for shutil.copytree
+# canonical 'rwx'-style string for each 3-bit permission value
+_PERM_STRS = ('', 'x', 'w', 'wx', 'r', 'rx', 'rw', 'rwx')
+# abspath -> (time checked, mode), for FilePerms.from_path(trust_for=...)
+_PERMS_CACHE = {}
+_PERMS_CACHE_MAX = 1024
 try:
     basestring
 except NameError:
     basestring = (str, bytes)  # Python 3 compat
+try:
+    WindowsError
+except NameError:
+    WindowsError = None  # non-Windows platforms
+try:
+    from os import scandir as _scandir
+except ImportError:
+    _scandir = None  # Python < 3.5, fall back to os.walk
+try:
+    from os import sendfile as _sendfile
+except ImportError:
+    _sendfile = None  # Python 2 and non-POSIX platforms
+try:
+    from os import copy_file_range as _copy_file_range
+except ImportError:
+    _copy_file_range = None  # Python < 3.8 and non-Linux platforms
+try:
+    from fcntl import ioctl as _ioctl
+except ImportError:
+    _ioctl = None  # Windows
+_FICLONE = 0x40049409  # Linux ioctl for copy-on-write file clones
+if not sys.platform.startswith('linux'):
+    _ioctl = None
+try:
+    _monotonic = time.monotonic
+except AttributeError:
+    _monotonic = time.time  # Python 2
+if sys.version_info[0] >= 3:
+    _fdopen = open  # the built-in open() accepts file descriptors
+else:
+    def _fdopen(fd, mode, buffering=-1):
+        return os.fdopen(fd, mode, buffering)
 
 
 def mkdir_p(path):
@@ -88,47 +135,49 @@ class FilePerms(object):
     class _FilePermProperty(object):
         _perm_chars = 'rwx'
         _perm_set = frozenset('rwx')
-        _perm_val = {'r': 4, 'w': 2, 'x': 1}  # for sorting
-
-        def __init__(self, attribute, offset):
-            self.attribute = attribute
+        _perm_val = {'r': 4, 'w': 2, 'x': 1}
+        # every ordering of every valid permission string, so that
+        # the common case is a single lookup
+        _perm_bits = dict([(''.join(p), bits)
+                           for bits, perm_str in enumerate(_PERM_STRS)
+                           for p in permutations(perm_str)])
+
+        def __init__(self, offset):
             self.offset = offset
+            self.shift = offset * 3
+            self.mask = ~(_SINGLE_FULL_PERM << self.shift)
 
         def __get__(self, fp_obj, type_=None):
             if fp_obj is None:
                 return self
-            return getattr(fp_obj, self.attribute)
+            return _PERM_STRS[(fp_obj._integer >> self.shift)
+                              & _SINGLE_FULL_PERM]
 
         def __set__(self, fp_obj, value):
-            cur = getattr(fp_obj, self.attribute)
-            if cur == value:
-                return
             try:
-                invalid_chars = set(str(value)) - self._perm_set
+                bits = self._perm_bits[value]
+            except (KeyError, TypeError):
+                bits = self._parse_bits(value)
+            fp_obj._integer = ((fp_obj._integer & self.mask)
+                               | (bits << self.shift))
+
+        def _parse_bits(self, value):
+            # slow path for repeated characters and invalid values
+            try:
+                chars = set(str(value))
             except TypeError:
                 raise TypeError('expected string, not %r' % value)
+            invalid_chars = chars - self._perm_set
             if invalid_chars:
                 raise ValueError('got invalid chars %r in permission'
                                  ' specification %r, expected empty string'
                                  ' or one or more of %r'
                                  % (invalid_chars, value, self._perm_chars))
-
-            sort_key = lambda c: self._perm_val[c]
-            new_value = ''.join(sorted(set(value),
-                                       key=sort_key, reverse=True))
-            setattr(fp_obj, self.attribute, new_value)
-            self._update_integer(fp_obj, new_value)
-
-        def _update_integer(self, fp_obj, value):
-            mode = 0
-            key = 'xwr'
-            for symbol in value:
-                bit = 2 ** key.index(symbol)
-                mode |= (bit << (self.offset * 3))
-            fp_obj._integer |= mode
+            return sum([self._perm_val[c] for c in chars])
 
     def __init__(self, user='', group='', other=''):
-        self._user, self._group, self._other = '', '', ''
+        # the integer is the only state, the rwx-style strings are
+        # derived from it on access
         self._integer = 0
         self.user = user
         self.group = group
@@ -141,39 +190,51 @@ class FilePerms(object):
         >>> FilePerms.from_int(0o644)  # note the leading zero-oh for octal
         FilePerms(user='rw', group='r', other='r')
         """
-        i &= FULL_PERMS
-        key = ('', 'x', 'w', 'xw', 'r', 'rx', 'rw', 'rwx')
-        parts = []
-        while i:
-            parts.append(key[i & _SINGLE_FULL_PERM])
-            i >>= 3
-        parts.reverse()
-        return cls(*parts)
+        ret = cls()
+        ret._integer = i & FULL_PERMS
+        return ret
 
     @classmethod
-    def from_path(cls, path):
+    def from_path(cls, path, trust_for=0):
         """Make a new :class:`FilePerms` object based on the permissions
         assigned to the file or directory at *path*.
 
         Args:
             path (str): Filesystem path of the target file.
+            trust_for (float): Number of seconds for which permissions
+                previously read from the same path may be reused,
+                skipping the :func:`os.stat` call. Defaults to ``0``,
+                always reading from the filesystem.
 
         >>> from os.path import expanduser
         >>> 'r' in FilePerms.from_path(expanduser('~')).user  # probably
         True
         """
-        stat_res = os.stat(path)
-        return cls.from_int(stat.S_IMODE(stat_res.st_mode))
+        key = os.path.abspath(path)
+        now = _monotonic()
+        if trust_for:
+            try:
+                checked_at, mode = _PERMS_CACHE[key]
+            except KeyError:
+                pass
+            else:
+                if now - checked_at < trust_for:
+                    return cls.from_int(mode)
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        if len(_PERMS_CACHE) >= _PERMS_CACHE_MAX:
+            _PERMS_CACHE.clear()
+        _PERMS_CACHE[key] = (now, mode)
+        return cls.from_int(mode)
 
     def __int__(self):
         return self._integer
 
     # Sphinx tip: attribute docstrings come after the attribute
-    user = _FilePermProperty('_user', 2)
+    user = _FilePermProperty(2)
     "Stores the ``rwx``-formatted *user* permission."
-    group = _FilePermProperty('_group', 1)
+    group = _FilePermProperty(1)
     "Stores the ``rwx``-formatted *group* permission."
-    other = _FilePermProperty('_other', 0)
+    other = _FilePermProperty(0)
     "Stores the ``rwx``-formatted *other* permission."
 
     def __repr__(self):
@@ -189,6 +250,18 @@ def atomic_save(dest_path, **kwargs):
     return AtomicSaver(dest_path, **kwargs)
 
 
+def _fsync_dir(path):
+    # persists renames and new entries in the directory at *path*
+    try:
+        dir_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # platforms which cannot open directories, i.e., Windows
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
 def _atomic_rename(path, new_path, overwrite=False):
     if overwrite:
         os.rename(path, new_path)
@@ -221,6 +294,14 @@ class AtomicSaver(object):
             alternative. Defaults to :func:`open()`.
         open_kwargs (dict): Additional keyword arguments to pass to
             *open_func*. Defaults to ``{}``.
+        io_bufsize (int): Size of the write buffer, passed to
+            *open_func* as *buffering*. Defaults to 1 MiB when using
+            the built-in :func:`open()`, and is not passed to other
+            *open_func* callables unless set explicitly.
+        fsync (bool): Whether to :func:`os.fsync` the part file before
+            moving it into place, and its directory afterward, so that
+            the saved file survives a system crash. Defaults to
+            ``False``.
     """
     # TODO: option to abort if target file modify date has changed
     # since start?
@@ -231,8 +312,14 @@ class AtomicSaver(object):
         self.part_filename = kwargs.pop('part_file', None)
         self.text_mode = kwargs.pop('text_mode', False)  # for windows
         self.rm_part_on_exc = kwargs.pop('rm_part_on_exc', True)
+        self.fsync = kwargs.pop('fsync', False)
         self._open = kwargs.pop('open_func', open)
-        self._open_kwargs = kwargs.pop('open_kwargs', {})
+        self._open_kwargs = dict(kwargs.pop('open_kwargs', {}))
+        io_bufsize = kwargs.pop('io_bufsize', None)
+        if io_bufsize is None and self._open is open:
+            io_bufsize = DEFAULT_IO_BUFSIZE
+        if io_bufsize is not None:
+            self._open_kwargs.setdefault('buffering', io_bufsize)
         if kwargs:
             raise TypeError('unexpected kwargs: %r' % kwargs.keys)
 
@@ -251,7 +338,7 @@ class AtomicSaver(object):
         the ``setup()`` method creates the temporary file in the same
         directory as the destination file.
 
-        ``setup()`` tests for a writable directory with rename permissions
+        Creating the part file directly tests for a writable directory
         early, as the part file may not be written to immediately (not
         using :func:`os.access` because of the potential issues of
         effective vs. real privileges).
@@ -265,23 +352,75 @@ class AtomicSaver(object):
                 raise OSError(errno.EEXIST,
                               'Overwrite disabled and file already exists',
                               self.dest_path)
-        _, tmp_part_path = tempfile.mkstemp(dir=self.dest_dir,
-                                            text=self.text_mode)
+        if self.overwrite_part:
+            # unlink rather than truncate, so that a symlink at the part
+            # path is replaced instead of followed, and the new part
+            # file always gets _PART_PERMS and the current owner
+            try:
+                os.unlink(self.part_path)
+            except OSError as oe:
+                if oe.errno != errno.ENOENT:
+                    raise
+        flags = os.O_RDWR | os.O_CREAT | os.O_EXCL
+        if not self.text_mode:
+            flags |= getattr(os, 'O_BINARY', 0)  # for windows
+        fd = os.open(self.part_path, flags, _PART_PERMS)
+        if self._open is not open:
+            # custom open_func callables take a path, not a descriptor
+            os.close(fd)
+            self.part_file = self._open(self.part_path, self.mode,
+                                        **self._open_kwargs)
+            return
+        # wrap the descriptor rather than reopening the part path, which
+        # could have been replaced (e.g., by a symlink) in the meantime
         try:
-            _atomic_rename(tmp_part_path, self.part_path,
-                           overwrite=self.overwrite_part)
-        except OSError:
-            os.unlink(tmp_part_path)
+            self.part_file = _fdopen(fd, self.mode, **self._open_kwargs)
+        except Exception:
+            os.close(fd)
             raise
 
-        self.part_file = self._open(self.part_path, self.mode,
-                                    **self._open_kwargs)
+    def copy_from(self, src_path):
+        """Write the contents of the file at *src_path* to the part
+        file, after anything already written. Where supported, the
+        copy is done by the kernel with :func:`os.sendfile`, without
+        passing the data through Python.
+
+        Must be called after :meth:`setup` (i.e., inside the
+        :keyword:`with` block).
+        """
+        part_file = self.part_file
+        if self.text_mode or _sendfile is None:
+            with open(src_path, 'r' if self.text_mode else 'rb') as src:
+                copyfileobj(src, part_file)
+            return
+        part_file.flush()
+        out_fd = part_file.fileno()
+        with open(src_path, 'rb') as src:
+            in_fd, offset = src.fileno(), 0
+            size = os.fstat(in_fd).st_size
+            try:
+                while offset < size:
+                    sent = _sendfile(out_fd, in_fd, offset, size - offset)
+                    if not sent:
+                        break  # source was truncated
+                    offset += sent
+            except OSError:
+                if offset:
+                    raise
+                # e.g., platforms which only sendfile() to sockets
+                copyfileobj(src, part_file)
+        return
 
     def __enter__(self):
         self.setup()
         return self.part_file
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.part_file:
+            if self.fsync and not exc_type:
+                self.part_file.flush()
+                os.fsync(self.part_file.fileno())
+            self.part_file.close()
         if exc_type:
             if self.rm_part_on_exc:
                 try:
@@ -295,10 +434,72 @@ class AtomicSaver(object):
         except OSError:
             if self.rm_part_on_exc:
                 os.unlink(self.part_path)
+            return
+        if self.fsync:
+            _fsync_dir(self.dest_dir)
         return
 
 
 _CUR_DIR = os.path.dirname(os.path.abspath(__file__))
+_GLOB_RE_CACHE = {}
+_GLOB_RE_CACHE_MAX = 256
+
+
+def _compile_globs(patterns, ignored):
+    """Returns a single compiled regex which matches filenames matching
+    any of the glob-formatted *patterns*, but none of the *ignored*
+    patterns. The ignored patterns are folded in as a negative
+    lookahead, so each filename is checked with one regex call. Both
+    arguments must be tuples, as results are cached by their value.
+    """
+    key = (patterns, ignored)
+    try:
+        return _GLOB_RE_CACHE[key]
+    except KeyError:
+        pass
+    pattern = '(?:%s)' % '|'.join([fnmatch.translate(p) for p in patterns])
+    if ignored:
+        ign_pattern = '|'.join([fnmatch.translate(p) for p in ignored])
+        pattern = '(?!(?:%s))%s' % (ign_pattern, pattern)
+    if len(_GLOB_RE_CACHE) >= _GLOB_RE_CACHE_MAX:
+        _GLOB_RE_CACHE.clear()
+    ret = _GLOB_RE_CACHE[key] = re.compile(pattern)
+    return ret
+
+
+def _iter_files(directory):
+    """Yields a ``(path, basename)`` pair for every non-directory under
+    *directory*, top-down, with the same skipping of unreadable
+    directories and symlinked directories as :func:`os.walk`.
+
+    Where available, this uses :func:`os.scandir`, whose entries
+    already know whether they are directories, saving a :func:`os.stat`
+    call per entry on most platforms.
+    """
+    if _scandir is None:
+        for root, dirs, files in os.walk(directory):
+            for basename in files:
+                yield os.path.join(root, basename), basename
+        return
+    dir_stack = [directory]
+    while dir_stack:
+        try:
+            entries = list(_scandir(dir_stack.pop()))
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield entry.path, entry.name
+            elif not entry.is_symlink():
+                subdirs.append(entry.path)
+        subdirs.reverse()
+        dir_stack.extend(subdirs)
+    return
 
 
 def iter_find_files(directory, patterns, ignored=None):
@@ -328,24 +529,75 @@ def iter_find_files(directory, patterns, ignored=None):
 
     """
     if isinstance(patterns, basestring):
-        patterns = [patterns]
-    pats_re = re.compile('|'.join([fnmatch.translate(p) for p in patterns]))
-
+        patterns = (patterns,)
     if not ignored:
-        ignored = []
+        ignored = ()
     elif isinstance(ignored, basestring):
-        ignored = [ignored]
-    ign_re = re.compile('|'.join([fnmatch.translate(p) for p in ignored]))
-    for root, dirs, files in os.walk(directory):
-        for basename in files:
-            if pats_re.match(basename):
-                if ignored and ign_re.match(basename):
-                    continue
-                filename = os.path.join(root, basename)
-                yield filename
+        ignored = (ignored,)
+    match = _compile_globs(tuple(patterns), tuple(ignored)).match
+
+    for filename, basename in _iter_files(directory):
+        if match(basename):
+            yield filename
     return
 
 
+def _clone_fd(src_fd, dst_fd, size):
+    # Returns True if the data was cloned or copied in-kernel, False if
+    # neither is supported for this pair of files.
+    if _ioctl is not None:
+        try:
+            _ioctl(dst_fd, _FICLONE, src_fd)
+            return True
+        except (IOError, OSError):
+            pass  # not a reflink-capable filesystem, or across filesystems
+    if _copy_file_range is None:
+        return False
+    copied = 0
+    while copied < size:
+        try:
+            sent = _copy_file_range(src_fd, dst_fd, size - copied)
+        except OSError:
+            if copied:
+                raise
+            return False  # e.g., across filesystems on older kernels
+        if not sent:
+            break
+        copied += sent
+    return True
+
+
+def _fast_copy2(src, dst):
+    """A drop-in for :func:`shutil.copy2` when the destination is a file
+    path. On Linux, it first tries cloning the file (instant and
+    copy-on-write on btrfs, XFS, and other reflink-capable
+    filesystems), then :func:`os.copy_file_range`, which copies within
+    the kernel. Anything else is left to :func:`shutil.copy2`.
+    """
+    if _ioctl is None and _copy_file_range is None:
+        return copy2(src, dst)
+    src_stat = os.stat(src)
+    if not stat.S_ISREG(src_stat.st_mode):
+        return copy2(src, dst)  # let shutil handle and reject special files
+    try:
+        dst_stat = os.stat(dst)
+    except OSError:
+        pass
+    else:
+        # opening dst for writing would truncate src, check like copy2
+        if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev,
+                                                  dst_stat.st_ino):
+            raise SameFileError('%r and %r are the same file' % (src, dst))
+    with open(src, 'rb') as src_file:
+        with open(dst, 'wb') as dst_file:
+            done = _clone_fd(src_file.fileno(), dst_file.fileno(),
+                             src_stat.st_size)
+    if not done:
+        return copy2(src, dst)
+    copystat(src, dst)
+    return dst
+
+
 def copy_tree(src, dst, symlinks=False, ignore=None):
     """The ``copy_tree`` function is an exact copy of the built-in
     :func:`shutil.copytree`, with one key difference: it will not
@@ -363,8 +615,22 @@ def copy_tree(src, dst, symlinks=False, ignore=None):
     For more details, check out :func:`shutil.copytree` and
     :func:`shutil.copy2`.
 
+    On Python 3.8+, where :func:`shutil.copytree` gained the
+    *dirs_exist_ok* argument, this delegates to it directly. On Linux,
+    files are cloned or copied within the kernel where the filesystem
+    allows it.
     """
-    names = os.listdir(src)
+    if _HAS_DIRS_EXIST_OK:
+        return shutil.copytree(src, dst, symlinks=symlinks, ignore=ignore,
+                               copy_function=_fast_copy2,
+                               dirs_exist_ok=True)
+    if _scandir is not None:
+        # DirEntry objects cache the file type, saving stat calls below
+        entries = list(_scandir(src))
+        names = [entry.name for entry in entries]
+    else:
+        names = os.listdir(src)
+        entries = [None] * len(names)
     if ignore is not None:
         ignored_names = ignore(src, names)
     else:
@@ -372,20 +638,26 @@ def copy_tree(src, dst, symlinks=False, ignore=None):
 
     mkdir_p(dst)
     errors = []
-    for name in names:
+    for name, entry in zip(names, entries):
         if name in ignored_names:
             continue
         srcname = os.path.join(src, name)
         dstname = os.path.join(dst, name)
         try:
-            if symlinks and os.path.islink(srcname):
+            if entry is None:
+                is_link = symlinks and os.path.islink(srcname)
+                is_dir = not is_link and os.path.isdir(srcname)
+            else:
+                is_link = symlinks and entry.is_symlink()
+                is_dir = not is_link and entry.is_dir()
+            if is_link:
                 linkto = os.readlink(srcname)
                 os.symlink(linkto, dstname)
-            elif os.path.isdir(srcname):
+            elif is_dir:
                 copytree(srcname, dstname, symlinks, ignore)
             else:
                 # Will raise a SpecialFileError for unsupported file types
-                copy2(srcname, dstname)
+                _fast_copy2(srcname, dstname)
         # catch the Error from the recursive copytree so that we can
         # continue with other files
         except Error as e:
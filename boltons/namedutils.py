@@ -18,7 +18,9 @@ skinnier approach, you'll probably have to look to C.
 
 from __future__ import print_function
 
+import re as _re
 import sys as _sys
+from weakref import WeakValueDictionary as _WeakValueDictionary
 try:
     from collections import OrderedDict
 except ImportError:
@@ -38,17 +40,136 @@ except NameError:
 
 __all__ = ['namedlist', 'namedtuple']
 
-# Tiny templates
+_IDENT_RE = _re.compile(r'\A[^\W\d]\w*\Z')
 
-_repr_tmpl = '{name}=%r'
+# the mapping type returned by _asdict(); dicts preserve insertion
+# order from 3.7 on, making OrderedDict unnecessary there
+if _sys.version_info >= (3, 7):
+    _asdict_type = dict
+else:
+    _asdict_type = OrderedDict
 
-_imm_field_tmpl = '''\
-    {name} = _property(_itemgetter({index:d}), doc='Alias for field {index:d}')
-'''
+# Generated classes, keyed by (base type, calling module, typename,
+# field names, rename). Weak, so unused classes are not kept alive.
+_class_cache = _WeakValueDictionary()
+
+
+def _compile_class(tmpl, typename, field_names, verbose):
+    fmt_kw = {'typename': typename}
+    fmt_kw['field_names'] = field_names
+    fmt_kw['num_fields'] = len(field_names)
+    fmt_kw['arg_list'] = repr(field_names).replace("'", "")[1:-1]
+    fmt_kw['repr_fmt'] = ', '.join([name + '=%r' for name in field_names])
+    class_definition = tmpl.format(**fmt_kw)
+    if verbose:
+        # the field aliases are attached after exec (see _exec_class()),
+        # print them as the equivalent class body lines
+        mutable = tmpl is _namedlist_tmpl
+        field_defs = []
+        for index, name in enumerate(field_names):
+            fset = ', _itemsetter(%d)' % index if mutable else ''
+            field_defs.append("    %s = _property(_itemgetter(%d)%s, "
+                              "doc='Alias for field %d')"
+                              % (name, index, fset, index))
+        print(class_definition + '\n' + '\n'.join(field_defs))
+    try:
+        return compile(class_definition, '<string>', 'exec')
+    except SyntaxError as e:
+        raise SyntaxError(e.msg + ':\n' + class_definition)
+
+
+def _exec_class(code, typename, field_names, namespace, setter=None):
+    # Execute the compiled class definition in a temporary namespace,
+    # then add the field aliases.
+    exec_(code, namespace)
+    result = namespace[typename]
+    for index, name in enumerate(field_names):
+        fset = setter(index) if setter is not None else None
+        setattr(result, name, property(_itemgetter(index), fset,
+                                       doc='Alias for field %d' % index))
+    return result
+
+
+def _itemsetter(key):
+    def _itemsetter(obj, value):
+        obj[key] = value
+    return _itemsetter
+
+
+def _build_class(base, tmpl, typename, field_names, verbose, rename, module):
+    # A tuple of field names is already in cache key form, so repeat
+    # calls can skip normalization entirely.
+    if type(field_names) is tuple and not verbose:
+        try:
+            return _class_cache[(base, module, typename, field_names, rename)]
+        except (KeyError, TypeError):
+            pass
+
+    # Validate the field names.  At the user's option, either generate an error
+    # message or automatically replace the field name with a valid name.
+    if isinstance(field_names, basestring):
+        field_names = field_names.replace(',', ' ').split()
+    field_names = [str(x) for x in field_names]
+
+    cache_key = (base, module, typename, tuple(field_names), rename)
+    if not verbose:
+        try:
+            return _class_cache[cache_key]
+        except KeyError:
+            pass
+
+    _validate_name(typename)
+    seen = set()
+    for index, name in enumerate(field_names):
+        if rename:
+            if (not _IDENT_RE.match(name)
+                or _iskeyword(name)
+                or name.startswith('_')
+                or name in seen):
+                field_names[index] = name = '_%d' % index
+        else:
+            _validate_name(name)
+            if name.startswith('_'):
+                raise ValueError('Field names cannot start with an '
+                                 'underscore: %r' % name)
+            if name in seen:
+                raise ValueError('Encountered duplicate field name: %r'
+                                 % name)
+        seen.add(name)
+
+    # Fill in and compile the class template
+    field_names = tuple(field_names)
+    code = _compile_class(tmpl, typename, field_names, verbose)
+
+    # Support tracing utilities by setting a value for
+    # frame.f_globals['__name__']
+    base_name = base.__name__
+    namespace = {'__name__': 'named%s_%s' % (base_name, typename),
+                 '_' + base_name: base,
+                 '_asdict_type': _asdict_type}
+    setter = _itemsetter if base is list else None
+    result = _exec_class(code, typename, field_names, namespace, setter)
+
+    if module is not None:
+        result.__module__ = module
+    if not verbose:
+        _class_cache[cache_key] = result
+
+    return result
+
+
+def _validate_name(name):
+    if not _IDENT_RE.match(name):
+        if name[:1].isdigit():
+            raise ValueError('Type names and field names cannot start '
+                             'with a number: %r' % name)
+        raise ValueError('Type names and field names can only contain '
+                         'alphanumeric characters and underscores: %r'
+                         % name)
+    if _iskeyword(name):
+        raise ValueError('Type names and field names cannot be a '
+                         'keyword: %r' % name)
 
-_m_field_tmpl = '''\
-    {name} = _property(_itemgetter({index:d}), _itemsetter({index:d}), doc='Alias for field {index:d}')
-'''
 
 #################################################################
 ### namedtuple
@@ -81,8 +202,8 @@ class {typename}(tuple):
         return tmpl % self
 
     def _asdict(self):
-        'Return a new OrderedDict which maps field names to their values'
-        return OrderedDict(zip(self._fields, self))
+        'Return a new dict which maps field names to their values, in order'
+        return _asdict_type(zip(self._fields, self))
 
     def _replace(_self, **kwds):
         'Return a new {typename} object replacing field(s) with new values'
@@ -94,17 +215,10 @@ class {typename}(tuple):
     def __getnewargs__(self):
         'Return self as a plain tuple.  Used by copy and pickle.'
         return tuple(self)
-
-    __dict__ = _property(_asdict)
-
-    def __getstate__(self):
-        'Exclude the OrderedDict from pickling'  # wat
-        pass
-
-{field_defs}
 '''
 
-def namedtuple(typename, field_names, verbose=False, rename=False):
+def namedtuple(typename, field_names, verbose=False, rename=False,
+               module=None):
     """Returns a new subclass of tuple with named fields.
 
     >>> Point = namedtuple('Point', ['x', 'y'])
@@ -125,82 +239,23 @@ def namedtuple(typename, field_names, verbose=False, rename=False):
     Point(x=11, y=22)
     >>> p._replace(x=100)               # _replace() is like str.replace() but targets named fields
     Point(x=100, y=22)
-    """
-
-    # Validate the field names.  At the user's option, either generate an error
-    # message or automatically replace the field name with a valid name.
-    if isinstance(field_names, basestring):
-        field_names = field_names.replace(',', ' ').split()
-    field_names = [str(x) for x in field_names]
-    if rename:
-        seen = set()
-        for index, name in enumerate(field_names):
-            if (not all(c.isalnum() or c == '_' for c in name)
-                or _iskeyword(name)
-                or not name
-                or name[0].isdigit()
-                or name.startswith('_')
-                or name in seen):
-                field_names[index] = '_%d' % index
-            seen.add(name)
-    for name in [typename] + field_names:
-        if not all(c.isalnum() or c == '_' for c in name):
-            raise ValueError('Type names and field names can only contain '
-                             'alphanumeric characters and underscores: %r'
-                             % name)
-        if _iskeyword(name):
-            raise ValueError('Type names and field names cannot be a '
-                             'keyword: %r' % name)
-        if name[0].isdigit():
-            raise ValueError('Type names and field names cannot start with '
-                             'a number: %r' % name)
-    seen = set()
-    for name in field_names:
-        if name.startswith('_') and not rename:
-            raise ValueError('Field names cannot start with an underscore: '
-                             '%r' % name)
-        if name in seen:
-            raise ValueError('Encountered duplicate field name: %r' % name)
-        seen.add(name)
-
-    # Fill-in the class template
-    fmt_kw = {'typename': typename}
-    fmt_kw['field_names'] = tuple(field_names)
-    fmt_kw['num_fields'] = len(field_names)
-    fmt_kw['arg_list'] = repr(tuple(field_names)).replace("'", "")[1:-1]
-    fmt_kw['repr_fmt'] = ', '.join(_repr_tmpl.format(name=name)
-                                   for name in field_names)
-    fmt_kw['field_defs'] = '\n'.join(_imm_field_tmpl.format(index=index, name=name)
-                                     for index, name in enumerate(field_names))
-    class_definition = _namedtuple_tmpl.format(**fmt_kw)
-
-    if verbose:
-        print(class_definition)
-
-    # Execute the template string in a temporary namespace and support
-    # tracing utilities by setting a value for frame.f_globals['__name__']
-    namespace = dict(_itemgetter=_itemgetter,
-                     __name__='namedtuple_%s' % typename,
-                     OrderedDict=OrderedDict,
-                     _property=property,
-                     _tuple=tuple)
-    try:
-        exec_(class_definition, namespace)
-    except SyntaxError as e:
-        raise SyntaxError(e.message + ':\n' + class_definition)
-    result = namespace[typename]
 
-    # For pickling to work, the __module__ variable needs to be set to the frame
-    # where the named tuple is created.  Bypass this step in environments where
-    # sys._getframe is not defined (Jython for example) or sys._getframe is not
-    # defined for arguments greater than 0 (IronPython).
-    try:
-        frame = _sys._getframe(1)
-        result.__module__ = frame.f_globals.get('__name__', '__main__')
-    except (AttributeError, ValueError):
-        pass
+    Pass *module* to set the new class's ``__module__`` explicitly,
+    instead of looking it up from the caller's frame.
+    """
 
-    return result
+    # For pickling to work, the __module__ variable needs to be set to
+    # the frame where the class is created.  Bypass this step in
+    # environments where sys._getframe is not defined (Jython for
+    # example) or sys._getframe is not defined for arguments greater
+    # than 0 (IronPython).
+    if module is None:
+        try:
+            module = _sys._getframe(1).f_globals.get('__name__', '__main__')
+        except (AttributeError, ValueError):
+            pass
+    return _build_class(tuple, _namedtuple_tmpl, typename, field_names,
+                        verbose, rename, module)
 
 
 #################################################################
@@ -239,8 +294,8 @@ class {typename}(list):
         return tmpl % tuple(self)
 
     def _asdict(self):
-        'Return a new OrderedDict which maps field names to their values'
-        return OrderedDict(zip(self._fields, self))
+        'Return a new dict which maps field names to their values, in order'
+        return _asdict_type(zip(self._fields, self))
 
     def _replace(_self, **kwds):
         'Return a new {typename} object replacing field(s) with new values'
@@ -252,18 +307,11 @@ class {typename}(list):
     def __getnewargs__(self):
         'Return self as a plain list.  Used by copy and pickle.'
         return tuple(self)
-
-    __dict__ = _property(_asdict)
-
-    def __getstate__(self):
-        'Exclude the OrderedDict from pickling'  # wat
-        pass
-
-{field_defs}
 '''
 
 
-def namedlist(typename, field_names, verbose=False, rename=False):
+def namedlist(typename, field_names, verbose=False, rename=False,
+              module=None):
     """Returns a new subclass of list with named fields.
 
     >>> Point = namedlist('Point', ['x', 'y'])
@@ -284,86 +332,20 @@ def namedlist(typename, field_names, verbose=False, rename=False):
     Point(x=11, y=22)
     >>> p._replace(x=100)               # _replace() is like str.replace() but targets named fields
     Point(x=100, y=22)
-    """
-
-    # Validate the field names.  At the user's option, either generate an error
-    # message or automatically replace the field name with a valid name.
-    if isinstance(field_names, basestring):
-        field_names = field_names.replace(',', ' ').split()
-    field_names = [str(x) for x in field_names]
-    if rename:
-        seen = set()
-        for index, name in enumerate(field_names):
-            if (not all(c.isalnum() or c == '_' for c in name)
-                or _iskeyword(name)
-                or not name
-                or name[0].isdigit()
-                or name.startswith('_')
-                or name in seen):
-                field_names[index] = '_%d' % index
-            seen.add(name)
-    for name in [typename] + field_names:
-        if not all(c.isalnum() or c == '_' for c in name):
-            raise ValueError('Type names and field names can only contain '
-                             'alphanumeric characters and underscores: %r'
-                             % name)
-        if _iskeyword(name):
-            raise ValueError('Type names and field names cannot be a '
-                             'keyword: %r' % name)
-        if name[0].isdigit():
-            raise ValueError('Type names and field names cannot start with '
-                             'a number: %r' % name)
-    seen = set()
-    for name in field_names:
-        if name.startswith('_') and not rename:
-            raise ValueError('Field names cannot start with an underscore: '
-                             '%r' % name)
-        if name in seen:
-            raise ValueError('Encountered duplicate field name: %r' % name)
-        seen.add(name)
-
-    # Fill-in the class template
-    fmt_kw = {'typename': typename}
-    fmt_kw['field_names'] = tuple(field_names)
-    fmt_kw['num_fields'] = len(field_names)
-    fmt_kw['arg_list'] = repr(tuple(field_names)).replace("'", "")[1:-1]
-    fmt_kw['repr_fmt'] = ', '.join(_repr_tmpl.format(name=name)
-                                   for name in field_names)
-    fmt_kw['field_defs'] = '\n'.join(_m_field_tmpl.format(index=index, name=name)
-                                     for index, name in enumerate(field_names))
-    class_definition = _namedlist_tmpl.format(**fmt_kw)
 
-    if verbose:
-        print(class_definition)
-
-    def _itemsetter(key):
-        def _itemsetter(obj, value):
-            obj[key] = value
-        return _itemsetter
-
-    # Execute the template string in a temporary namespace and support
-    # tracing utilities by setting a value for frame.f_globals['__name__']
-    namespace = dict(_itemgetter=_itemgetter,
-                     _itemsetter=_itemsetter,
-                     __name__='namedlist_%s' % typename,
-                     OrderedDict=OrderedDict,
-                     _property=property,
-                     _list=list)
-    try:
-        exec_(class_definition, namespace)
-    except SyntaxError as e:
-        raise SyntaxError(e.message + ':\n' + class_definition)
-    result = namespace[typename]
+    Pass *module* to set the new class's ``__module__`` explicitly,
+    instead of looking it up from the caller's frame.
+    """
 
     # For pickling to work, the __module__ variable needs to be set to
-    # the frame where the named list is created.  Bypass this step in
+    # the frame where the class is created.  Bypass this step in
     # environments where sys._getframe is not defined (Jython for
     # example) or sys._getframe is not defined for arguments greater
     # than 0 (IronPython).
-    try:
-        frame = _sys._getframe(1)
-        result.__module__ = frame.f_globals.get('__name__', '__main__')
-    except (AttributeError, ValueError):
-        pass
-
-    return result
+    if module is None:
+        try:
+            module = _sys._getframe(1).f_globals.get('__name__', '__main__')
+        except (AttributeError, ValueError):
+            pass
+    return _build_class(list, _namedlist_tmpl, typename, field_names,
+                        verbose, rename, module)
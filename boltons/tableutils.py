@@ -21,9 +21,10 @@ For more advanced :class:`Table`-style manipulation check out the
 
 from __future__ import print_function
 
-import cgi
 import types
-from itertools import islice
+from inspect import getmro
+from itertools import repeat
+from operator import attrgetter
 from collections import Sequence, Mapping, MutableSequence
 try:
     string_types, integer_types = (str, unicode), (int, long)
@@ -73,15 +74,21 @@ def to_text(obj, maxlen=None):
     return text
 
 
+# same characters as cgi.escape(text, quote=True)
+_HTML_ESCAPES = {ord(u'&'): u'&amp;', ord(u'<'): u'&lt;',
+                 ord(u'>'): u'&gt;', ord(u'"'): u'&quot;'}
+
+
 def escape_html(obj, maxlen=None):
     text = to_text(obj, maxlen=maxlen)
-    return cgi.escape(text, quote=True)
+    return text.translate(_HTML_ESCAPES)
 
 
-_DNR = set((type(None), bool, complex, float,
-            type(NotImplemented), slice,
-            types.FunctionType, types.MethodType, types.BuiltinFunctionType,
-            types.GeneratorType) + string_types + integer_types)
+_DNR = frozenset((type(None), bool, complex, float,
+                  type(NotImplemented), slice,
+                  types.FunctionType, types.MethodType,
+                  types.BuiltinFunctionType, types.GeneratorType)
+                 + string_types + integer_types)
 
 
 class UnsupportedData(TypeError):
@@ -112,32 +119,59 @@ class DictInputType(InputType):
 
 class ObjectInputType(InputType):
     def check_type(self, obj):
-        return type(obj) not in _DNR and hasattr(obj, '__class__')
+        return hasattr(obj, '__class__') and obj.__class__ not in _DNR
 
     def guess_headers(self, obj):
+        # gather public attributes from the instance and its classes,
+        # so that only descriptors (properties, slots) need a getattr()
+        attrs = dict(getattr(obj, '__dict__', None) or {})
+        for cls in getmro(obj.__class__):
+            for attr, val in cls.__dict__.items():
+                attrs.setdefault(attr, val)
         headers = []
-        for attr in dir(obj):
+        for attr, val in attrs.items():
             # an object's __dict__ could technically have non-string keys
-            try:
-                val = getattr(obj, attr)
-            except:
-                # seen on greenlet: `run` shows in dir() but raises
-                # AttributeError. Also properties misbehave.
+            if not isinstance(attr, string_types) or attr.startswith('_'):
                 continue
-            if callable(val):
+            if isinstance(val, (staticmethod, classmethod)) or callable(val):
                 continue
+            if hasattr(type(val), '__get__'):
+                try:
+                    val = getattr(obj, attr)
+                except:
+                    # seen on greenlet: `run` shows in dir() but raises
+                    # AttributeError. Also properties misbehave.
+                    continue
+                if callable(val):
+                    continue
             headers.append(attr)
-        return headers
+        return sorted(headers)
 
     def get_entry(self, obj, headers):
         values = []
         for h in headers:
             try:
                 values.append(getattr(obj, h))
-            except:
+            except Exception:
                 values.append(None)
         return values
 
+    def get_entry_seq(self, obj_seq, headers):
+        # attrgetter fetches all the headers in one call per object,
+        # but treats dotted names as paths, so those take the slow way,
+        # as do non-str headers (e.g., bytes on Python 3)
+        if len(headers) < 2 or not all(isinstance(h, str) and '.' not in h
+                                       for h in headers):
+            return [self.get_entry(obj, headers) for obj in obj_seq]
+        get_values = attrgetter(*headers)
+        entries = []
+        for obj in obj_seq:
+            try:
+                entries.append(list(get_values(obj)))
+            except Exception:
+                entries.append(self.get_entry(obj, headers))
+        return entries
+
 
 # might be better to hardcode list support since it's so close to the
 # core or might be better to make this the copy-style from_* importer
@@ -240,7 +274,10 @@ class Table(object):
         if headers is _MISSING:
             headers = []
             if data:
-                headers, data = list(data[0]), islice(data, 1, None)
+                data = iter(data)
+                first = next(data, _MISSING)
+                if first is not _MISSING:
+                    headers = list(first)
         self.headers = headers or []
         self._data = []
         self._width = 0
@@ -265,16 +302,17 @@ class Table(object):
         if self.headers:
             self._width = len(self.headers)
             return
-        self._width = max([len(d) for d in self._data])
+        if self._data:
+            self._width = max(map(len, self._data))
 
     def _fill(self):
-        width, filler = self._width, [None]
+        width = self._width
         if not width:
             return
         for d in self._data:
             rem = width - len(d)
             if rem > 0:
-                d.extend(filler * rem)
+                d.extend(repeat(None, rem))
         return
 
     @classmethod
@@ -345,7 +383,7 @@ class Table(object):
                     is_seq = False
                     to_check = data
         else:
-            if type(data) in _DNR:
+            if data.__class__ in _DNR:
                 # hmm, got scalar data.
                 # raise an exception or make an exception, nahmsayn?
                 return Table([[data]], headers=headers)
@@ -366,14 +404,13 @@ class Table(object):
             entries = [_data_type.get_entry(data, headers)]
         if max_depth > 1:
             new_max_depth = max_depth - 1
-            for i, entry in enumerate(entries):
+            for entry in entries:
                 for j, cell in enumerate(entry):
-                    if type(cell) in _DNR:
+                    if cell.__class__ in _DNR:
                         # optimization to avoid function overhead
                         continue
                     try:
-                        entries[i][j] = cls.from_data(cell,
-                                                      max_depth=new_max_depth)
+                        entry[j] = cls.from_data(cell, max_depth=new_max_depth)
                     except UnsupportedData:
                         continue
         return cls(entries, headers=headers)
@@ -443,8 +480,6 @@ class Table(object):
     def _add_horizontal_html_lines(self, lines, headers, max_depth):
         esc = escape_html
         new_depth = max_depth - 1 if max_depth > 1 else max_depth
-        if max_depth > 1:
-            new_depth = max_depth - 1
         if headers:
             _thth = self._html_th_close + self._html_th
             lines.append(self._html_tr + self._html_th +
@@ -463,7 +498,7 @@ class Table(object):
                         _fill_parts.append(esc(cell))
             else:
                 _fill_parts = [esc(c) for c in row]
-            lines.append(''.join([trtd, _tdtd.join(_fill_parts), _td_tr]))
+            lines.append(trtd + _tdtd.join(_fill_parts) + _td_tr)
 
     def _add_vertical_html_lines(self, lines, headers, max_depth):
         esc = escape_html
@@ -471,21 +506,18 @@ class Table(object):
         tr, th, _th = self._html_tr, self._html_th, self._html_th_close
         td, _tdtd = self._html_td, self._html_td_close + self._html_td
         _td_tr = self._html_td_close + self._html_tr_close
+        if max_depth > 1:
+            def fmt(cell):
+                if isinstance(cell, Table):
+                    return cell.to_html(max_depth=new_depth)
+                return esc(cell)
+        else:
+            fmt = esc
         for i in range(self._width):
             line_parts = [tr]
             if headers:
                 line_parts.extend([th, esc(headers[i]), _th])
-            if max_depth > 1:
-                new_depth = max_depth - 1
-                _fill_parts = []
-                for row in self._data:
-                    cell = row[i]
-                    if isinstance(cell, Table):
-                        _fill_parts.append(cell.to_html(max_depth=new_depth))
-                    else:
-                        _fill_parts.append(esc(row[i]))
-            else:
-                _fill_parts = [esc(row[i]) for row in self._data]
+            _fill_parts = [fmt(row[i]) for row in self._data]
             line_parts.extend([td, _tdtd.join(_fill_parts), _td_tr])
             lines.append(''.join(line_parts))
 
@@ -499,16 +531,13 @@ class Table(object):
         """
         # TODO: verify this works for markdown
         lines = []
-        widths = []
-        headers = list(self.headers)
         text_data = [[to_text(cell, maxlen=maxlen) for cell in row]
                      for row in self._data]
-        for idx in range(self._width):
-            cur_widths = [len(cur) for cur in text_data]
-            if with_headers:
-                cur_widths.append(len(to_text(headers[idx], maxlen=maxlen)))
-            widths.append(max(cur_widths))
+        widths = [max(map(len, col)) for col in zip(*text_data)]
         if with_headers:
+            headers = [to_text(h, maxlen=maxlen) for h in self.headers]
+            for idx, h in enumerate(headers):
+                widths[idx] = max(widths[idx], len(h))
             lines.append(' | '.join([h.center(widths[i])
                                      for i, h in enumerate(headers)]))
             lines.append('-+-'.join(['-' * w for w in widths]))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Times hits and insertions for the caches in cacheutils, alongside
+an index-based (struct-of-arrays) LRU list, kept here as a reference
+point for the link layout used by cacheutils.LRU.
+
+Run from the repo root: python misc/bench_lru.py
+"""
+
+import os
+import sys
+import timeit
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boltons.cacheutils import LRU, LRI, RandomReplacementCache
+
+
+class IndexLRUList(object):
+    """Just the recency-tracking part of an LRU, with prev/next links
+    stored as indices into parallel sequences. Slot 0 is the root.
+    """
+    def __init__(self, size, seq_type=list):
+        self.prev = seq_type(range(size + 1))
+        self.next = seq_type(range(size + 1))
+        self.values = [None] * (size + 1)
+        self.index_map = {}
+        self.prev[0] = self.next[0] = 0
+        for key in range(size):
+            i = key + 1
+            last = self.prev[0]
+            self.next[last] = i
+            self.prev[0] = i
+            self.prev[i], self.next[i] = last, 0
+            self.values[i] = key
+            self.index_map[key] = i
+
+    def __getitem__(self, key):
+        i = self.index_map[key]
+        prev, next_ = self.prev, self.next
+        link_prev, link_next = prev[i], next_[i]
+        next_[link_prev] = link_next
+        prev[link_next] = link_prev
+        last = prev[0]
+        next_[last] = i
+        prev[0] = i
+        prev[i], next_[i] = last, 0
+        return self.values[i]
+
+
+def bench_hits(cache, keys, number=200):
+    def run():
+        for key in keys:
+            cache[key]
+    return min(timeit.repeat(run, number=number, repeat=5))
+
+
+def bench_inserts(cache_type, size, number=20):
+    keys = range(size * 4)
+
+    def run():
+        cache = cache_type(max_size=size)
+        for key in keys:
+            cache[key] = key
+    return min(timeit.repeat(run, number=number, repeat=5))
+
+
+def main(size=1000):
+    keys = list(range(0, size, 7)) * 10
+    hit_caches = [('LRU', LRU(max_size=size)),
+                  ('LRU (thread_safe=False)',
+                   LRU(max_size=size, thread_safe=False)),
+                  ('LRI', LRI(max_size=size)),
+                  ('RandomReplacementCache',
+                   RandomReplacementCache(max_size=size))]
+    for name, cache in hit_caches:
+        cache.update([(k, k) for k in range(size)])
+    hit_caches.extend([('IndexLRUList (list)', IndexLRUList(size)),
+                       ('IndexLRUList (array)',
+                        IndexLRUList(size, lambda r: array('l', r)))])
+
+    print('hits (%s lookups x 200):' % len(keys))
+    for name, cache in hit_caches:
+        print('  %-26s %.4fs' % (name, bench_hits(cache, keys)))
+    print('inserts (%s keys x 20, max_size=%s):' % (size * 4, size))
+    for cache_type in (LRU, LRI, RandomReplacementCache):
+        print('  %-26s %.4fs' % (cache_type.__name__,
+                                 bench_inserts(cache_type, size)))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 
 import string
 
-from boltons.cacheutils import LRU, LRI
+from boltons.cacheutils import LRU, LRI, ShardedLRU, RandomReplacementCache
 
 
 def test_popitem_should_return_a_tuple():
@@ -39,3 +39,136 @@ def test_lru():
     assert 'bye' not in lru
     assert len(lru) == 0
     assert not lru
+
+
+def test_lru_setitem_existing():
+    lru = LRU(max_size=2)
+    lru['a'] = 0
+    lru['a'] = 1
+    lru['b'] = 2
+    assert len(lru.link_map) == 2
+    lru['a'] = 3  # refreshes 'a', making 'b' the oldest
+    lru['c'] = 4
+    assert 'b' not in lru
+    assert lru['a'] == 3
+    assert lru['c'] == 4
+
+
+def test_lru_thread_safe():
+    lru = LRU(max_size=2, thread_safe=False)
+    lru['a'] = 'A'
+    assert lru['a'] == 'A'
+    assert lru.copy().thread_safe is False
+
+    lru.set_thread_safe()
+    assert lru.thread_safe
+    with lru.lock:
+        lru['b'] = 'B'  # reentrant
+    assert len(lru) == 2
+
+
+def test_sharded_lru():
+    cache = ShardedLRU(max_size=8, shards=4, on_miss=lambda k: k * 2)
+    for i in range(100):
+        assert cache[i] == i * 2
+    assert len(cache) == 8
+    assert cache.miss_count == 100
+    assert all(len(shard) == 2 for shard in cache._shards)
+
+    cache.clear()
+    cache.update({'a': 1, 'b': 2})
+    assert 'a' in cache
+    assert cache.pop('a') == 1
+    assert cache.pop('a', None) is None
+    assert sorted(cache) == ['b']
+
+    for bad_shards in (0, 3):
+        try:
+            ShardedLRU(shards=bad_shards)
+        except ValueError:
+            pass
+        else:
+            assert False, 'expected ValueError'
+
+
+def test_random_replacement():
+    rr = RandomReplacementCache(10, on_miss=lambda k: k.upper())
+    for char in string.ascii_letters:
+        assert rr[char] == char.upper()
+    assert len(rr) == 10
+    assert rr.miss_count == len(string.ascii_letters)
+
+    rr.clear()
+    rr['a'] = 'A'
+    rr['a'] = 'AA'  # existing keys are never evicted to make room
+    assert rr.get('a') == 'AA'
+    assert rr.get('b') is not None  # on_miss supplies a value
+    assert rr.soft_miss_count == 0
+
+
+def test_random_replacement_large():
+    max_size = 100000
+    rr = RandomReplacementCache(max_size)
+    for i in range(2 * max_size):
+        rr[i] = i
+    assert len(rr) == max_size
+    assert rr[2 * max_size - 1] == 2 * max_size - 1  # newest is kept
+
+    del rr[2 * max_size - 1]
+    assert rr.pop(-1, None) is None
+    key = next(iter(rr))
+    assert rr.pop(key) == key
+    rr.popitem()
+    assert len(rr) == len(rr._keys) == len(rr._key_index) == max_size - 3
+    assert sorted(rr._keys) == sorted(rr)
+    for i in range(10):
+        rr['new%s' % i] = i
+    assert len(rr) == max_size
+
+
+def test_lru_miss_not_chained():
+    for thread_safe in (True, False):
+        lru = LRU(thread_safe=thread_safe)
+        try:
+            lru['missing']
+        except KeyError as ke:
+            assert getattr(ke, '__context__', None) is None
+        else:
+            assert False, 'expected KeyError'
+
+
+def test_lru_clear():
+    lru = LRU(max_size=2)
+    lru['a'] = 'A'
+    lru.clear()
+    for char in 'bcd':
+        lru[char] = char.upper()
+    assert sorted(lru.items()) == [('c', 'C'), ('d', 'D')]
+    assert lru.root.next.key == 'c'
+
+
+def test_lri_order():
+    lri = LRI(max_size=3)
+    for i in range(3):
+        lri[i] = i
+    lri[0] = 'zero'  # updates do not count as insertions
+    lri[3] = 3
+    lri[4] = 4
+    assert sorted(lri.keys()) == [2, 3, 4]
+    lri.clear()
+    lri['a'] = 'A'
+    assert list(lri.items()) == [('a', 'A')]
+
+
+def test_lru_bulk_update():
+    items = [(i % 7, i) for i in range(50)]
+    bulk = LRU(max_size=4, values=items)
+    one_by_one = LRU(max_size=4)
+    for k, v in items:
+        one_by_one[k] = v
+    assert dict(bulk) == dict(one_by_one)
+
+    for lru in (bulk, one_by_one):
+        lru['new'] = 'value'  # evicts the oldest key in both
+    assert dict(bulk) == dict(one_by_one)
+    assert bulk.hit_count == bulk.miss_count == 0
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import types
+import warnings
+
+from boltons.deprutils import deprecate_module_member
+
+
+def test_deprecated_member_warns_once():
+    mod_name = 'boltons_test_deprecated_mod'
+    module = types.ModuleType(mod_name)
+    module.old_name = 'value'
+    module.new_name = 'other'
+    sys.modules[mod_name] = module
+    try:
+        deprecate_module_member(mod_name, 'old_name', 'use new_name')
+        module = sys.modules[mod_name]
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            assert module.new_name == 'other'
+            assert not caught
+            assert module.old_name == 'value'
+            assert len(caught) == 1
+            assert caught[0].category is DeprecationWarning
+            assert str(caught[0].message) == 'use new_name'
+            assert module.old_name == 'value'
+            assert len(caught) == 1
+    finally:
+        del sys.modules[mod_name]
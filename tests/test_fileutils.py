@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from boltons.fileutils import FilePerms
+import os
+import shutil
+
+from boltons.fileutils import (FilePerms, iter_find_files,
+                               atomic_save, AtomicSaver, copytree)
+
+
+CUR_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 def test_fileperms():
@@ -19,3 +26,169 @@ def test_fileperms():
     assert oct(int(up)).endswith('770')  # 0770 on py2 and 0o770 on py3
 
     assert int(FilePerms()) == 0
+
+
+def test_fileperms_from_int():
+    for i in range(0o1000):
+        assert int(FilePerms.from_int(i)) == i
+    assert FilePerms.from_int(0o300).user == 'wx'
+
+
+def test_fileperms_reassign():
+    fp = FilePerms(user='rwx', group='rx')
+    fp.user = 'r'
+    fp.group = ''
+    assert int(fp) == 0o400
+    assert int(fp) == int(FilePerms.from_int(int(fp)))
+
+
+def test_iter_find_files():
+    found = set([os.path.basename(fn)
+                 for fn in iter_find_files(CUR_DIR, ['*.py', '*.txt'],
+                                           ignored='test_*')])
+    assert '__init__.py' in found
+    assert 'jsonl_test_data.txt' in found
+    assert not [fn for fn in found if fn.startswith('test_')]
+
+
+def test_atomic_save_copy_from(tmpdir):
+    src_path = str(tmpdir.join('src.bin'))
+    dest_path = str(tmpdir.join('dest.bin'))
+    data = os.urandom(300000)
+    with open(src_path, 'wb') as f:
+        f.write(data)
+
+    with atomic_save(dest_path) as f:
+        f.write(b'head')
+    with open(dest_path, 'rb') as f:
+        assert f.read() == b'head'
+
+    saver = AtomicSaver(dest_path)
+    with saver as f:
+        f.write(b'head')
+        saver.copy_from(src_path)
+        f.write(b'tail')
+    with open(dest_path, 'rb') as f:
+        assert f.read() == b'head' + data + b'tail'
+    assert not os.path.exists(dest_path + '.part')
+
+
+def test_atomic_save_part_file(tmpdir):
+    dest_path = str(tmpdir.join('dest.txt'))
+    part_path = dest_path + '.part'
+    with open(part_path, 'w') as f:
+        f.write('stale part file contents')
+
+    try:
+        with atomic_save(dest_path, overwrite_partfile=False) as f:
+            f.write(b'nope')
+    except OSError:
+        pass
+    else:
+        assert False, 'expected OSError for existing part file'
+
+    with atomic_save(dest_path, text_mode=True, io_bufsize=4096) as f:
+        f.write('new')
+    with open(dest_path) as f:
+        assert f.read() == 'new'
+    assert os.listdir(str(tmpdir)) == ['dest.txt']
+
+
+def test_atomic_save_part_symlink(tmpdir):
+    victim_path = str(tmpdir.join('victim.txt'))
+    with open(victim_path, 'w') as f:
+        f.write('victim')
+    dest_path = str(tmpdir.join('out.txt'))
+    os.symlink(victim_path, dest_path + '.part')
+
+    with atomic_save(dest_path) as f:
+        f.write(b'new')
+    with open(victim_path) as f:
+        assert f.read() == 'victim'
+    assert not os.path.islink(dest_path)
+    with open(dest_path) as f:
+        assert f.read() == 'new'
+
+
+def test_atomic_save_open_func(tmpdir):
+    import codecs
+    dest_path = str(tmpdir.join('dest.txt'))
+    with atomic_save(dest_path, text_mode=True, open_func=codecs.open,
+                     open_kwargs={'encoding': 'utf-8'}) as f:
+        f.write(u'caf\xe9')
+    with open(dest_path, 'rb') as f:
+        assert f.read() == b'caf\xc3\xa9'
+
+    with atomic_save(dest_path) as f:
+        # the built-in open() wraps the descriptor setup() created
+        part_stat = os.stat(dest_path + '.part')
+        file_stat = os.fstat(f.fileno())
+        assert part_stat.st_ino == file_stat.st_ino
+        f.write(b'bytes')
+
+
+def test_atomic_save_fsync(tmpdir):
+    dest_path = str(tmpdir.join('dest.txt'))
+    with atomic_save(dest_path, fsync=True) as f:
+        f.write(b'durable')
+    with open(dest_path, 'rb') as f:
+        assert f.read() == b'durable'
+
+
+def test_copytree(tmpdir):
+    src = tmpdir.mkdir('src')
+    src.join('a.txt').write('a')
+    src.mkdir('sub').join('b.txt').write('b')
+    src.join('skip.pyc').write('')
+    dst = tmpdir.mkdir('dst')
+    dst.join('existing.txt').write('e')
+
+    copytree(str(src), str(dst), ignore=shutil.ignore_patterns('*.pyc'))
+    assert sorted(os.listdir(str(dst))) == ['a.txt', 'existing.txt', 'sub']
+    assert dst.join('sub', 'b.txt').read() == 'b'
+
+
+def test_copytree_large_file(tmpdir):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    src = tmpdir.mkdir('src')
+    src.join('big.bin').write_binary(data)
+    os.chmod(str(src.join('big.bin')), 0o640)
+
+    copytree(str(src), str(tmpdir.join('dst')))
+    copied = tmpdir.join('dst', 'big.bin')
+    assert copied.read_binary() == data
+    assert os.stat(str(copied)).st_mode & 0o777 == 0o640
+
+
+def test_copytree_same_file(tmpdir):
+    src = tmpdir.mkdir('src')
+    src.join('a.txt').write('a')
+    try:
+        copytree(str(src), str(src))
+    except shutil.Error:
+        pass
+    else:
+        assert False, 'expected shutil.Error'
+    assert src.join('a.txt').read() == 'a'
+
+    dst = tmpdir.mkdir('dst')
+    os.symlink(str(src.join('a.txt')), str(dst.join('a.txt')))
+    try:
+        copytree(str(src), str(dst))
+    except shutil.Error:
+        pass
+    else:
+        assert False, 'expected shutil.Error'
+    assert src.join('a.txt').read() == 'a'
+
+
+def test_fileperms_from_path_trust_for(tmpdir):
+    path = str(tmpdir.join('perms.txt'))
+    open(path, 'w').close()
+    os.chmod(path, 0o640)
+    assert int(FilePerms.from_path(path)) == 0o640
+
+    os.chmod(path, 0o600)
+    assert int(FilePerms.from_path(path, trust_for=60)) == 0o640
+    assert int(FilePerms.from_path(path)) == 0o600
+    assert int(FilePerms.from_path(path, trust_for=60)) == 0o600
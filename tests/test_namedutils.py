@@ -29,3 +29,71 @@ def test_namedlist_pickle():
 def test_namedtuple_pickle():
     p = Point(x=10, y=20)
     assert p == loads(dumps(p))
+
+
+def test_class_cache():
+    assert namedtuple('Point', 'x, y', rename=True) is Point
+    assert namedlist('MutablePoint', 'x, y', rename=True) is MutablePoint
+    assert namedtuple('Point', 'x, y') is not Point  # rename differs
+    assert namedtuple('Point', 'x, y, z') is not Point
+    assert namedtuple('MutablePoint', 'x, y', rename=True) is not MutablePoint
+    assert Point.__module__ == __name__
+
+
+def test_class_names():
+    Pair = namedtuple('Pair', 'x, y', rename=True)
+    assert Pair is not Point
+    assert Pair.__name__ == 'Pair'
+    assert Pair.__doc__ == 'Pair(x, y)'
+    assert repr(Pair(1, y=2)) == 'Pair(x=1, y=2)'
+    assert Pair(1, 2) == Point(1, 2)
+    for cls in (Pair, Point, MutablePoint):
+        qualname = getattr(cls.__new__, '__qualname__', None)
+        assert qualname in (None, cls.__name__ + '.__new__')
+    try:
+        Pair(1)
+    except TypeError as te:
+        assert '_NamedType' not in str(te)
+
+
+def test_invalid_names():
+    for field_names in ('1x', 'a-b', 'def', 'x x', '_x', ['']):
+        try:
+            namedtuple('Invalid', field_names)
+        except ValueError:
+            pass
+        else:
+            assert False, 'expected ValueError for %r' % (field_names,)
+    Renamed = namedtuple('Renamed', '1x def x x _y', rename=True)
+    assert Renamed._fields == ('_0', '_1', 'x', '_3', '_4')
+
+
+def test_tuple_field_names():
+    assert namedtuple('Point', ('x', 'y'), rename=True) is Point
+    assert namedlist('MutablePoint', ('x', 'y'), rename=True) is MutablePoint
+    Listy = namedtuple('Listy', (['x'], 'y'), rename=True)
+    assert Listy._fields == ('_0', 'y')
+
+
+def test_explicit_module():
+    Remote = namedtuple('Point', 'x, y', rename=True, module='other.mod')
+    assert Remote.__module__ == 'other.mod'
+    assert Remote is not Point
+    assert namedtuple('Point', 'x, y', rename=True, module=__name__) is Point
+    assert namedlist('MutablePoint', 'x, y', rename=True,
+                     module=__name__) is MutablePoint
+
+
+def test_verbose(capsys):
+    namedlist('Verbose', 'a, b', verbose=True)
+    source = capsys.readouterr()[0]
+    from operator import itemgetter
+    from boltons.namedutils import _itemsetter, _asdict_type
+    namespace = dict(_itemgetter=itemgetter, _itemsetter=_itemsetter,
+                     _property=property, _list=list,
+                     _asdict_type=_asdict_type)
+    exec(source, namespace)
+    v = namespace['Verbose'](1, 2)
+    v.b = 3
+    assert v.a == 1 and v == [1, 3]
+    assert namespace['Verbose'].__doc__ == 'Verbose(a, b)'
@@ -50,3 +50,87 @@ def test_table_obj():
     t4 = Table.from_object(TestType())
     assert len(t4) == 1
     assert 'greeting' in t4.headers
+
+
+def test_table_text_widths():
+    t = Table([['id', 'name'],
+               [1, 'John Doe'],
+               [22, 'Al']])
+    lines = t.to_text().splitlines()
+    assert lines[0] == 'id |   name  '
+    assert lines[1] == '---+---------'
+    assert lines[2] == '1  | John Doe'
+    assert lines[3] == '22 |    Al   '
+    assert Table([[1, 2]], headers=['a', 3]).to_text() == 'a | 3\n--+--\n1 | 2'
+    assert Table([[1, 'abc']], headers=None).to_text(with_headers=False) \
+        == '1 | abc'
+
+
+def test_table_html_escape():
+    t = Table([['<b>', 'a & "b"']], headers=None)
+    assert '<td>&lt;b&gt;</td><td>a &amp; &quot;b&quot;</td>' in \
+        t.to_html(orientation='h')
+
+
+def test_table_iter_data():
+    rows = iter([['id', 'name'], [1, 'John Doe'], [2, 'Dale Simmons']])
+    t = Table(rows)
+    assert t.headers == ['id', 'name']
+    assert len(t) == 2
+    assert t[1] == [2, 'Dale Simmons']
+
+
+def test_table_nested():
+    data = [{'id': 1, 'tags': {'a': 1}},
+            {'id': 2, 'tags': 'none'}]
+    t = Table.from_data(data, headers=['id', 'tags'], max_depth=2)
+    assert isinstance(t[0][1], Table)
+    assert list(t[0][1].headers) == ['a']
+    assert t[1][1] == 'none'
+    assert '<table>' in t.to_html(max_depth=2)[len('<table>'):]
+    assert '<table>' in t.to_html(orientation='v', max_depth=2)[1:]
+
+
+def test_table_obj_headers():
+    class Base(object):
+        kind = 'base'
+
+        def method(self):
+            pass
+
+    class Slotted(Base):
+        __slots__ = ('a', 'b', 'unset')
+
+        def __init__(self):
+            self.a, self.b = 1, 2
+
+        @property
+        def total(self):
+            return self.a + self.b
+
+        @property
+        def callback(self):
+            return self.method
+
+        @staticmethod
+        def helper():
+            pass
+
+    t = Table.from_object(Slotted())
+    assert t.headers == ['a', 'b', 'kind', 'total']
+    assert t[0] == [1, 2, 'base', 3]
+
+
+def test_table_obj_seq():
+    class Pt(object):
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+
+    partial = Pt(3, 4)
+    del partial.y
+    t = Table.from_data([Pt(1, 2), partial], headers=['x', 'y', 'a.b'])
+    assert t._data == [[1, 2, None], [3, None, None]]
+    t = Table.from_data([Pt(1, 2), partial], headers=['x', 'y'])
+    assert t._data == [[1, 2], [3, None]]
+    t = Table.from_data([Pt(1, 2)], headers=['x', b'y', 5])
+    assert t._data[0][0] == 1 and t._data[0][2] is None